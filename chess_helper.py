@@ -1,12 +1,205 @@
 import chess
 import chess.engine
 import chess.pgn
+import chess.polyglot
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog
+from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog
 import threading
 from datetime import datetime
+import multiprocessing
+import argparse
 import json
 import os
+import re
+import time
+
+
+# === Perft: validation de la génération de coups et benchmark CPU ===
+
+# Cache de transpositions propre à chaque processus fils, partagé entre coups
+# racine et entrées d'une suite; vidé dès qu'il atteint PERFT_CACHE_SIZE
+PERFT_CACHE_SIZE = 1 << 20
+_perft_cache = {}
+
+
+def perft(board, depth, cache=None):
+    """Compte les positions feuilles à la profondeur donnée"""
+    if depth == 0:
+        return 1
+    if depth == 1:
+        return board.legal_moves.count()
+
+    # Cache de transpositions indexé par la clé Zobrist et la profondeur;
+    # en dessous de 3 le hachage coûte plus cher que le sous-arbre
+    use_cache = cache is not None and depth >= 3
+    if use_cache:
+        key = (chess.polyglot.zobrist_hash(board), depth)
+        if key in cache:
+            return cache[key]
+
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += perft(board, depth - 1, cache)
+        board.pop()
+
+    if use_cache:
+        if len(cache) >= PERFT_CACHE_SIZE:
+            cache.clear()
+        cache[key] = nodes
+    return nodes
+
+
+def _perft_root_move(fen, uci, depth, use_cache):
+    """Compte les noeuds sous un coup racine (exécuté dans un processus fils)"""
+    board = chess.Board(fen)
+    board.push(chess.Move.from_uci(uci))
+    return uci, perft(board, depth - 1, _perft_cache if use_cache else None)
+
+
+def _perft_worker_pid(_):
+    """Identifie le processus fils qui a pris la tâche (préchauffage)"""
+    time.sleep(0.01)
+    return os.getpid()
+
+
+def start_perft_pool(workers=None):
+    """Démarre un pool de processus pour perft et attend que tous soient prêts
+
+    Retourne (pool, durée de démarrage en secondes).
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    # "spawn" évite de dupliquer l'interpréteur Tk et les threads en cours
+    pool = multiprocessing.get_context("spawn").Pool(workers)
+    # Chaque fils réimporte chess et ce module: on attend qu'ils aient tous répondu
+    ready = set()
+    while len(ready) < workers:
+        ready.update(pool.map(_perft_worker_pid, range(workers), chunksize=1))
+    return pool, time.perf_counter() - start
+
+
+def _check_perft_cancel(cancel):
+    """Interrompt le calcul si l'événement d'annulation est levé"""
+    if cancel is not None and cancel.is_set():
+        raise RuntimeError("Perft annulé")
+
+
+def perft_divide(fen, depth, pool=None, use_cache=False, cancel=None):
+    """Perft « divide »: répartit les coups racine sur un pool de processus
+
+    Sans pool, les coups racine sont comptés dans le processus courant.
+    cancel est un threading.Event optionnel qui interrompt le calcul.
+    Retourne (compte par coup UCI, total de noeuds, durée en secondes).
+    """
+    if depth < 1:
+        return {}, 1, 0.0
+
+    board = chess.Board(fen)
+    root_moves = [move.uci() for move in board.legal_moves]
+    start = time.perf_counter()
+
+    if depth == 1 or pool is None:
+        # Cache local au calcul, libéré à la fin
+        cache = {} if use_cache else None
+        results = []
+        for move in list(board.legal_moves):
+            _check_perft_cancel(cancel)
+            board.push(move)
+            results.append((move.uci(), perft(board, depth - 1, cache)))
+            board.pop()
+    else:
+        pending = pool.starmap_async(_perft_root_move, [(fen, uci, depth, use_cache) for uci in root_moves],
+                                     chunksize=1)
+        # Attente par tranches: un pool arrêté par terminate() ne répond plus
+        while not pending.ready():
+            _check_perft_cancel(cancel)
+            pending.wait(0.1)
+        results = pending.get()
+
+    elapsed = time.perf_counter() - start
+    divide = dict(results)
+    total = sum(divide.values())
+    return divide, total, elapsed
+
+
+def load_epd_suite(filename):
+    """Lit une suite perft EPD (« FEN ;D1 20 ;D2 400 ... »)"""
+    suite = []
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [field.strip() for field in line.split(";")]
+            expected = {}
+            for field in fields[1:]:
+                # Ignore les autres opcodes EPD (bm, dm, id...)
+                match = re.fullmatch(r"D(\d+)\s+(\d+)", field)
+                if match:
+                    expected[int(match.group(1))] = int(match.group(2))
+            suite.append((fields[0], expected))
+    return suite
+
+
+def run_perft_suite(filename, max_depth, pool=None, use_cache=False, cancel=None):
+    """Compare perft aux comptes de référence d'une suite EPD
+
+    Le même pool (et donc le cache de chaque fils) sert à toute la suite.
+    Retourne une liste de (fen, profondeur, attendu, obtenu, durée).
+    """
+    results = []
+    for fen, expected in load_epd_suite(filename):
+        # Complète les EPD à 4 champs pour chess.Board
+        if len(fen.split()) == 4:
+            fen += " 0 1"
+        for depth in sorted(expected):
+            if depth > max_depth:
+                break
+            _, nodes, elapsed = perft_divide(fen, depth, pool, use_cache, cancel)
+            results.append((fen, depth, expected[depth], nodes, elapsed))
+    return results
+
+
+def format_nps(nodes, elapsed):
+    """Formate la vitesse en noeuds par seconde"""
+    return f"{nodes / elapsed:,.0f} n/s" if elapsed > 0 else "n/a"
+
+
+def format_startup(startup):
+    """Formate le coût de démarrage du pool, exclu des noeuds par seconde"""
+    return [] if startup is None else [f"Démarrage du pool: {startup:.3f} s"]
+
+
+def format_divide(divide, total, elapsed, startup=None):
+    """Formate le résultat d'un perft divide"""
+    lines = [f"{uci}: {count}" for uci, count in sorted(divide.items())]
+    lines.append("")
+    lines.append(f"Noeuds: {total}")
+    lines.append(f"Temps: {elapsed:.3f} s ({format_nps(total, elapsed)})")
+    lines.extend(format_startup(startup))
+    return "\n".join(lines)
+
+
+def format_suite(results, startup=None):
+    """Formate le rapport d'une suite perft EPD"""
+    lines = []
+    failures = 0
+    total_nodes = 0
+    total_time = 0.0
+    for fen, depth, expected, nodes, elapsed in results:
+        ok = nodes == expected
+        failures += not ok
+        total_nodes += nodes
+        total_time += elapsed
+        status = "OK" if ok else f"ÉCHEC (attendu {expected})"
+        lines.append(f"{fen} D{depth}: {nodes} {status}")
+    lines.append("")
+    lines.append(f"{len(results) - failures}/{len(results)} comptes corrects")
+    lines.append(f"Noeuds: {total_nodes} en {total_time:.3f} s ({format_nps(total_nodes, total_time)})")
+    lines.extend(format_startup(startup))
+    return "\n".join(lines)
+
 
 class ChessSandbox:
     def __init__(self, stockfish_path):
@@ -22,6 +215,10 @@ class ChessSandbox:
         self.root = tk.Tk()
         self.root.title("Chess Sandbox avec Stockfish")
         self.root.geometry("1200x800")
+        self.perft_cache_var = tk.BooleanVar(value=False)
+        self.perft_pool = None
+        self.perft_running = False
+        self.perft_cancel = threading.Event()
         
         self.setup_ui()
         self.update_display()
@@ -44,6 +241,14 @@ class ChessSandbox:
         view_menu.add_command(label="Retourner l'échiquier", command=self.flip_board)
         menubar.add_cascade(label="Affichage", menu=view_menu)
 
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_command(label="Perft / Benchmark", command=self.run_perft)
+        tools_menu.add_command(label="Suite perft EPD", command=self.run_perft_suite)
+        tools_menu.add_command(label="Annuler perft", command=self.cancel_perft)
+        tools_menu.add_separator()
+        tools_menu.add_checkbutton(label="Cache de transpositions", variable=self.perft_cache_var)
+        menubar.add_cascade(label="Outils", menu=tools_menu)
+
         self.root.config(menu=menubar)
 
         # Frame principal
@@ -619,7 +824,7 @@ class ChessSandbox:
     
     def save_position(self):
         """Sauvegarde la position actuelle"""
-        name = tk.simpledialog.askstring("Sauvegarder", "Nom de la position:")
+        name = simpledialog.askstring("Sauvegarder", "Nom de la position:")
         if name:
             position = {
                 "name": name,
@@ -637,6 +842,108 @@ class ChessSandbox:
             except:
                 messagebox.showerror("Erreur", "Impossible de sauvegarder")
     
+    def _ask_perft_depth(self, prompt, initial):
+        """Demande une profondeur perft, avec confirmation pour les calculs longs"""
+        if self.perft_running:
+            messagebox.showinfo("Perft", "Un perft est déjà en cours")
+            return None
+        depth = simpledialog.askinteger("Perft", prompt, initialvalue=initial, minvalue=1, maxvalue=6)
+        if depth and depth >= 5 and not messagebox.askyesno(
+                "Perft", f"Un perft à la profondeur {depth} peut durer plusieurs minutes. Continuer?"):
+            return None
+        return depth
+
+    def _start_perft(self, status, compute):
+        """Exécute compute(pool, startup, cancel) dans un thread annulable"""
+        cancel = threading.Event()
+        self.perft_cancel = cancel
+        self.perft_running = True
+        self.info_label.config(text=status)
+
+        def worker():
+            pool = None
+            try:
+                pool, startup = start_perft_pool()
+                self.perft_pool = pool
+                title, report = compute(pool, startup, cancel)
+                if not cancel.is_set():
+                    self.root.after(0, self._show_perft_report, title, report)
+            except Exception as e:
+                # Annulé ou fenêtre fermée: l'état a déjà été rétabli
+                if not cancel.is_set():
+                    self.root.after(0, self._show_perft_error, e)
+            finally:
+                if pool is not None:
+                    pool.terminate()
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _stop_perft(self):
+        """Signale l'annulation et arrête les processus du perft en cours"""
+        self.perft_cancel.set()
+        if self.perft_pool is not None:
+            self.perft_pool.terminate()
+            self.perft_pool = None
+
+    def cancel_perft(self):
+        """Annule le perft en cours"""
+        if self.perft_running:
+            self._stop_perft()
+            self.perft_running = False
+            self.update_display()
+
+    def run_perft(self):
+        """Lance un perft divide sur la position courante"""
+        depth = self._ask_perft_depth("Profondeur:", 4)
+        if not depth:
+            return
+
+        fen = self.board.fen()
+        use_cache = self.perft_cache_var.get()
+
+        def compute(pool, startup, cancel):
+            divide, total, elapsed = perft_divide(fen, depth, pool, use_cache, cancel)
+            report = f"{fen}\nProfondeur {depth}\n\n" + format_divide(divide, total, elapsed, startup)
+            return f"Perft D{depth}", report
+
+        self._start_perft(f"Perft profondeur {depth} en cours...", compute)
+
+    def run_perft_suite(self):
+        """Vérifie perft sur une suite EPD de référence"""
+        filename = filedialog.askopenfilename(
+            title="Suite perft EPD",
+            filetypes=[("Fichiers EPD", "*.epd"), ("Tous les fichiers", "*.*")]
+        )
+        if not filename:
+            return
+        max_depth = self._ask_perft_depth("Profondeur maximale:", 3)
+        if not max_depth:
+            return
+
+        use_cache = self.perft_cache_var.get()
+
+        def compute(pool, startup, cancel):
+            results = run_perft_suite(filename, max_depth, pool, use_cache, cancel)
+            return "Suite perft", format_suite(results, startup)
+
+        self._start_perft("Suite perft en cours...", compute)
+
+    def _show_perft_error(self, error):
+        """Affiche une erreur perft et rétablit l'état (thread principal)"""
+        self.perft_running = False
+        self.update_display()
+        messagebox.showerror("Erreur", f"Erreur perft: {error}")
+
+    def _show_perft_report(self, title, report):
+        """Affiche un rapport perft dans une fenêtre (thread principal)"""
+        self.perft_running = False
+        self.update_display()
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        text = scrolledtext.ScrolledText(window, height=30, width=80)
+        text.pack(fill=tk.BOTH, expand=True)
+        text.insert(1.0, report)
+    
     def run(self):
         """Lance l'application"""
         # Charge les positions sauvegardées
@@ -654,10 +961,37 @@ class ChessSandbox:
     
     def close(self):
         """Ferme l'application"""
+        self._stop_perft()
         self.engine.quit()
         self.root.destroy()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chess Sandbox avec Stockfish")
+    parser.add_argument("--perft", type=int, metavar="PROFONDEUR", help="perft divide sans interface")
+    parser.add_argument("--fen", default=chess.STARTING_FEN, help="position pour --perft")
+    parser.add_argument("--epd", metavar="FICHIER", help="suite perft EPD à vérifier jusqu'à --perft")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus")
+    parser.add_argument("--cache", action="store_true", help="active le cache de transpositions")
+    args = parser.parse_args()
+
+    if args.perft is not None and args.perft < 1:
+        parser.error("--perft doit être au moins 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers doit être au moins 1")
+
+    if args.epd or args.perft is not None:
+        pool, startup = (None, None) if args.workers == 1 else start_perft_pool(args.workers)
+        try:
+            if args.epd:
+                max_depth = args.perft if args.perft is not None else 3
+                print(format_suite(run_perft_suite(args.epd, max_depth, pool, args.cache), startup))
+            else:
+                print(format_divide(*perft_divide(args.fen, args.perft, pool, args.cache), startup))
+        finally:
+            if pool is not None:
+                pool.terminate()
+        raise SystemExit
+
     stockfish_path = r"C:\Users\marvi\Downloads\stockfish-windows-x86-64-avx2\stockfish\stockfish-windows-x86-64-avx2.exe"
     
     app = ChessSandbox(stockfish_path)